@@ -1,66 +1,405 @@
 import streamlit as st
+import hashlib
 import json
-import networkx as nx
-from pyvis.network import Network
+import os
+import re
+import tempfile
+import orjson
 from streamlit.components.v1 import html
-import pandas as pd
-import altair as alt
-import plotly.graph_objs as go
-
-# Optional: for auto‑play
-try:
-    from streamlit_autorefresh import st_autorefresh
-except ImportError:
-    st.warning("Install 'streamlit-autorefresh' for auto‑play functionality.")
 
 # ----------------------------------------------------------------------------
 # CACHING FUNCTIONS
 # ----------------------------------------------------------------------------
 
-@st.cache_data
+# an optional UTF-8 BOM and the JSON whitespace before the first token
+JSON_LEAD = re.compile(rb'(\xef\xbb\xbf)?[ \t\n\r]*')
+
 def load_data(uploader):
-    return json.load(uploader)
+    # parse straight from the upload buffer; getvalue() would copy it first
+    with uploader.getbuffer() as buf:
+        # parse_robot_data needs a message array; reject anything else from
+        # its first token instead of after a full parse. The elements are
+        # checked as parse_robot_data walks them
+        lead = JSON_LEAD.match(buf)
+        if buf[lead.end():lead.end() + 1] != b'[':
+            raise ValueError("expected a JSON array of message objects")
+        # orjson rejects a UTF-8 BOM, which the stdlib parser accepted
+        return orjson.loads(buf[3:] if lead.group(1) else buf)
+
+def sort_by_time(df):
+    # logs are normally recorded in time order, so check before sorting; the
+    # sort is stable, keeping same-stamp rows (e.g. joints) in log order
+    if not df['timestamp'].is_monotonic_increasing:
+        df = df.sort_values('timestamp', kind='stable')
+    return df.reset_index(drop=True)
 
-@st.cache_data
 def parse_robot_data(data):
-    events, poses, joints = [], [], []
+    # accumulate columns rather than a dict per row; building a DataFrame
+    # from lists skips the per-row key scan and dtype inference. A single
+    # loop beats pd.json_normalize here: that walks every message in Python
+    # too, flattens every nested key, and still needs the same fallbacks
+    ev = {c: [] for c in ('timestamp', 'topic', 'type', 'source', 'target', 'raw')}
+    po = {c: [] for c in ('timestamp', 'x', 'y', 'z')}
+    jo = {c: [] for c in ('timestamp', 'joint', 'angle')}
+    # hot loop: bind the appenders and helpers to locals, and test exact
+    # types; a missing header falls back to one shared empty dict
+    ev_ts, ev_topic, ev_type = ev['timestamp'].append, ev['topic'].append, ev['type'].append
+    ev_src, ev_dst, ev_raw = ev['source'].append, ev['target'].append, ev['raw'].append
+    po_ts, po_x, po_y, po_z = po['timestamp'].append, po['x'].append, po['y'].append, po['z'].append
+    jo_ts, jo_joint, jo_angle = jo['timestamp'].extend, jo['joint'].extend, jo['angle'].extend
+    dumps, empty = orjson.dumps, {}
     for msg in data:
-        ts = msg.get('timestamp') or msg.get('header', {}).get('stamp', {})
-        if isinstance(ts, dict):
+        if type(msg) is not dict:
+            raise ValueError("expected a JSON array of message objects")
+        ts = msg.get('timestamp') or msg.get('header', empty).get('stamp', empty)
+        if type(ts) is dict:
             ts = ts.get('secs', 0) + ts.get('nsecs', 0) * 1e-9
         try:
             ts = float(ts)
         except:
             continue
-        op = msg.get('operation', 'message')
-        topic = msg.get('topic', '')
-        content = msg.get('msg') or msg.get('data') or {}
+        content = msg.get('msg') or msg.get('data') or empty
 
         src = content.get('from') or content.get('source')
         dst = content.get('to') or content.get('target')
-        evt = content.get('type') or op
         if src and dst:
-            events.append({'timestamp': ts, 'topic': topic, 'type': evt,
-                           'source': src, 'target': dst, 'raw': content})
+            ev_ts(ts); ev_topic(msg.get('topic', '')); ev_type(content.get('type') or msg.get('operation', 'message'))
+            ev_src(src); ev_dst(dst); ev_raw(dumps(content).decode())
 
         pos = content.get('position')
-        if isinstance(pos, dict):
-            poses.append({'timestamp': ts, 'x': pos.get('x'),
-                          'y': pos.get('y'), 'z': pos.get('z')})
+        if type(pos) is dict:
+            po_ts(ts); po_x(pos.get('x')); po_y(pos.get('y')); po_z(pos.get('z'))
 
         js = content.get('joint_states')
-        if isinstance(js, dict):
-            for name, angle in js.items():
-                joints.append({'timestamp': ts, 'joint': name, 'angle': angle})
+        if type(js) is dict:
+            jo_ts([ts] * len(js)); jo_joint(js.keys()); jo_angle(js.values())
 
-    df_e = (pd.DataFrame(events)
+    df_e = (pd.DataFrame(ev)
             .dropna(subset=['source', 'target'])
-            .sort_values('timestamp')
-            .reset_index(drop=True))
-    df_p = pd.DataFrame(poses).sort_values('timestamp').reset_index(drop=True) if poses else pd.DataFrame()
-    df_j = pd.DataFrame(joints).sort_values('timestamp').reset_index(drop=True) if joints else pd.DataFrame()
+            .pipe(sort_by_time)
+            # a handful of distinct labels repeated per event: categorical
+            # codes instead of a str object per row, in memory and on disk
+            .astype({c: 'category' for c in ('topic', 'type', 'source', 'target')}))
+    df_p = sort_by_time(pd.DataFrame(po)) if po['timestamp'] else pd.DataFrame()
+    df_j = sort_by_time(pd.DataFrame(jo)) if jo['timestamp'] else pd.DataFrame()
+
+    # sanitize once at load: non-numeric / non-finite readings become NaN.
+    # Positions and angles are plotted only, so float32 halves them in memory
+    # and in the figure payload; timestamps stay float64, whose precision
+    # float32 would lose at epoch magnitudes
+    if not df_p.empty:
+        xyz = df_p[['x','y','z']].apply(pd.to_numeric, errors='coerce').astype(np.float32)
+        df_p[['x','y','z']] = xyz.where(np.isfinite(xyz))
+    if not df_j.empty:
+        ang = pd.to_numeric(df_j['angle'], errors='coerce').astype(np.float32)
+        df_j['angle'] = ang.where(np.isfinite(ang))
     return df_e, df_p, df_j
 
+# parsed frames are persisted as Feather files keyed by content hash, so a
+# server restart or a re-upload of the same log skips the JSON parse. The
+# directory is per user; bump CACHE_FORMAT whenever parse_robot_data's
+# output (columns, dtypes) changes, so older frames are not served
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         "robot_viz")
+CACHE_FORMAT = 1
+FRAME_NAMES = ('events', 'poses', 'joints')
+CACHE_MAX_BYTES = 1 << 30
+
+def prune_cache(keep):
+    # least-recently-used eviction: cache hits refresh the files' mtime, and
+    # the oldest go first once the directory outgrows CACHE_MAX_BYTES
+    # (mtime, size, path) tuples sort natively, oldest first, without a key.
+    # Only finished frames count; other sessions' temp files may appear or
+    # vanish at any point, so each file is stat'ed and removed on its own
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.feather'):
+            continue
+        p = os.path.join(CACHE_DIR, name)
+        try:
+            info = os.stat(p)
+        except OSError:
+            continue
+        entries.append((info.st_mtime, info.st_size, p))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in entries:
+        if total <= CACHE_MAX_BYTES:
+            break
+        if os.path.basename(p).startswith(keep):
+            continue
+        try:
+            os.remove(p)
+        except OSError:
+            continue
+        total -= size
+
+def content_digest(uploader):
+    with uploader.getbuffer() as buf:
+        return hashlib.blake2b(buf, digest_size=16).hexdigest()
+
+def private_cache_dir():
+    # frames are only trusted from a directory no other account can write
+    # to; an existing one with looser permissions or another owner is skipped
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.stat(CACHE_DIR)
+    except OSError:
+        return False
+    owner = os.getuid() if hasattr(os, 'getuid') else info.st_uid
+    return info.st_uid == owner and not info.st_mode & 0o077
+
+def write_frame(df, path):
+    # a uniquely named temp file per writer, so sessions caching the same
+    # upload at once do not clobber each other's half-written file
+    with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.tmp', delete=False) as f:
+        tmp = f.name
+        try:
+            df.to_feather(f, compression='lz4')
+        except BaseException:
+            f.close()
+            os.remove(tmp)
+            raise
+    os.replace(tmp, path)
+
+def load_frames(digest, uploader):
+    paths = [os.path.join(CACHE_DIR, f"{digest}.v{CACHE_FORMAT}.{name}.feather")
+             for name in FRAME_NAMES]
+    cached = private_cache_dir()
+    if cached:
+        try:
+            frames = tuple(pd.read_feather(p) for p in paths)
+            for p in paths:
+                os.utime(p)
+            return frames
+        # not cached yet, a partial/corrupt file, or no pyarrow new enough for
+        # pandas' Feather I/O, which then also makes the writes below a no-op
+        except (OSError, ValueError, ImportError):
+            pass
+    frames = parse_robot_data(load_data(uploader))
+    if cached:
+        try:
+            for df, p in zip(frames, paths):
+                write_frame(df, p)
+            prune_cache(digest)
+        except Exception:  # the disk cache is best-effort
+            pass
+    return frames
+
+# keyed on the upload's content digest rather than the parsed messages,
+# which were re-hashed in full on every rerun
+@st.cache_data(show_spinner="Parsing robot data...", max_entries=8)
+def load_robot_data(digest, _uploader):
+    # the parsed message tree is dropped once the frames are built; the raw
+    # viewer reads the upload's text instead
+    df_e, df_p, df_j = load_frames(digest, _uploader)
+    # integer codes (into the sorted option lists) for the per-rerun filters
+    topic_codes, topics = pd.factorize(df_e['topic'], sort=True)
+    type_codes, types   = pd.factorize(df_e['type'], sort=True)
+    # source/target codes into one node-name list, so the node search runs
+    # over the distinct names instead of every event
+    node_codes, node_names = pd.factorize(pd.concat([df_e['source'], df_e['target']]))
+    n_ev = len(df_e)
+    # (source, target) pair code per event, numbered in sorted pair order, so
+    # edge weights per rerun are a bincount instead of a string groupby
+    pairs = df_e.groupby(['source','target'], observed=True)
+    edge_codes = pairs.ngroup().to_numpy()
+    sizes = pairs.size()
+    max_w = int(sizes.max()) if len(sizes) else 1
+    # 50 equal-width time bins over the whole log for the analytics series,
+    # labelled with the interval strings the charts have always shown
+    if df_e.empty:
+        time_bins, bin_labels = np.zeros(0, np.int8), []
+    else:
+        cuts = pd.cut(df_e['timestamp'], bins=50)
+        time_bins, bin_labels = cuts.cat.codes.to_numpy(), [str(iv) for iv in cuts.cat.categories]
+    return dict(events=df_e, poses=df_p, joints=df_j,
+                topics=list(topics), types=list(types),
+                topic_codes=topic_codes, type_codes=type_codes,
+                src_codes=node_codes[:n_ev], tgt_codes=node_codes[n_ev:],
+                node_names=node_names, edge_codes=edge_codes,
+                edge_src=sizes.index.get_level_values('source').to_numpy(),
+                edge_tgt=sizes.index.get_level_values('target').to_numpy(),
+                time_bins=time_bins, bin_labels=bin_labels,
+                max_w=max_w)
+
+# pose/joint plots only depend on the upload; build them once per file and
+# overlay the current-time cursor per rerun
+@st.cache_resource(max_entries=4)
+def pose_figure(data_key, _df_poses):
+    fig3d = go.Figure(go.Scatter3d(
+        x=_df_poses['x'], y=_df_poses['y'], z=_df_poses['z'],
+        mode='markers+lines', marker=dict(size=3)
+    ))
+    fig3d.update_layout(scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z'))
+    return fig3d
+
+def minmax_indices(y, n_out=2000):
+    # keep the min and max sample of at most n_out/2 equal-count buckets (the
+    # last one may be short), so spikes survive while a chart is ~2 points/pixel
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    k = -(-n // (n_out // 2))
+    n_bins = -(-n // k)
+    # NaN-pad the short last bucket; NaNs never win below unless a whole
+    # bucket is NaN, and then argmin/argmax land on its first (real) sample
+    padded = np.full(n_bins * k, np.nan)
+    padded[:n] = y
+    nan = np.isnan(padded)
+    lows  = np.where(nan, np.inf, padded).reshape(n_bins, k).argmin(axis=1)
+    highs = np.where(nan, -np.inf, padded).reshape(n_bins, k).argmax(axis=1)
+    offs = np.arange(n_bins) * k
+    return np.unique(np.concatenate([offs + lows, offs + highs]))
+
+def time_bin_counts(time_bins, bin_labels, codes, names, on, col):
+    # events per (time bin, selected option) as one bincount over combined
+    # codes; rows are bin-major and every bin has a row per selected option,
+    # zero when empty, as the old pd.cut groupby returned them (observed=False)
+    n_b = len(bin_labels)
+    keep = on[codes]
+    counts = np.bincount(codes[keep] * n_b + time_bins[keep],
+                         minlength=len(names) * n_b).reshape(len(names), n_b).T
+    sel = np.flatnonzero(on)
+    b, c = np.repeat(np.arange(n_b), len(sel)), np.tile(sel, n_b)
+    return pd.DataFrame({'timestamp': np.asarray(bin_labels, dtype=object)[b],
+                         col: np.asarray(names, dtype=object)[c],
+                         'count': counts[b, c]})
+
+# WebGL traces keep long joint logs responsive; an SVG/Vega line chart
+# embeds and draws every sample
+@st.cache_resource(max_entries=4)
+def joint_figure(data_key, _df_joints):
+    fig = go.Figure()
+    for name, grp in _df_joints.groupby('joint', sort=True):
+        keep = minmax_indices(grp['angle'].to_numpy())
+        fig.add_trace(go.Scattergl(x=grp['timestamp'].to_numpy()[keep], y=grp['angle'].to_numpy()[keep],
+                                   mode='lines', name=name))
+    fig.update_layout(xaxis_title='timestamp', yaxis_title='angle', legend_title_text='joint')
+    return fig
+
+def build_graph(edges, nodes):
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)  # first, so node order matches the caller's graph
+    G.add_weighted_edges_from(edges)
+    return G
+
+# node-count caps for the all-pairs style algorithms, which would stall the
+# app on large uploads
+COMMUNITY_MAX = 2000
+PATH_METRICS_MAX = 1500
+AVG_PATH_EXACT_MAX = 500
+
+def approx_avg_short(U, k=50):
+    # mean BFS distance from k sampled sources: O(k·(V+E)) instead of the
+    # all-pairs O(V·(V+E)) of the exact average
+    nodes = list(U)
+    total = count = 0
+    for i in np.random.default_rng(0).choice(len(nodes), min(k, len(nodes)), replace=False):
+        lens = nx.single_source_shortest_path_length(U, nodes[i])
+        total += sum(lens.values()); count += len(lens) - 1
+    return total / max(count, 1)
+
+# Louvain is close to linear in the edge count; greedy modularity merging
+# slows to a crawl past a few thousand nodes
+@st.cache_data(max_entries=16)
+def graph_communities(edges, nodes):
+    G = build_graph(edges, nodes)
+    if G.number_of_nodes() > COMMUNITY_MAX:
+        return [set(G.nodes())]
+    try:
+        comms = nx.community.louvain_communities(G, weight='weight', seed=0)
+        if not comms: comms = [set(G.nodes())]
+    except:
+        comms = [set(G.nodes())]
+    return comms
+
+# graph metrics only depend on the filtered graph, not on which widget
+# triggered the rerun; key them on its edge and node lists
+@st.cache_data(max_entries=16)
+def graph_metrics(edges, nodes):
+    G = build_graph(edges, nodes)
+    n = G.number_of_nodes()
+    if n == 0:
+        return dict(density=0.0, clust=0.0, avg_short=None, avg_short_est=False, capped=False,
+                    deg_c={}, betw_c={}, clos_c={}, clustcoef={}, eig_c={})
+    capped = n > PATH_METRICS_MAX
+    # one undirected copy for all the undirected metrics; a to_undirected
+    # view is cheaper to make but slower to traverse, and it is walked
+    # several times below
+    U = G.to_undirected()
+    try:
+        density = nx.density(G)
+    except:
+        density = 0.0
+    # average_clustering is the mean of the per-node coefficients, which the
+    # centrality table needs anyway
+    clustcoef = nx.clustering(U)
+    clust = sum(clustcoef.values()) / len(clustcoef)
+    avg_short_est = n >= AVG_PATH_EXACT_MAX
+    try:
+        if not nx.is_connected(U):
+            avg_short = None
+        elif avg_short_est:
+            avg_short = approx_avg_short(U)
+        else:
+            avg_short = nx.average_shortest_path_length(U)
+    except:
+        avg_short = None
+    # sparse ARPACK (scipy.sparse.linalg.eigs) on a CSR adjacency; networkx
+    # refuses graphs that are not strongly connected, which fall back to 0
+    try:
+        eig_c = nx.eigenvector_centrality_numpy(G)
+    except:
+        eig_c = {n:0 for n in G.nodes()}
+    # past the cap betweenness is estimated from 100 sampled sources and
+    # closeness is skipped
+    return dict(density=density, clust=clust, avg_short=avg_short,
+                avg_short_est=avg_short_est, capped=capped,
+                deg_c=nx.degree_centrality(G),
+                betw_c=(nx.betweenness_centrality(G, k=100, seed=0) if capped
+                        else nx.betweenness_centrality(G)),
+                clos_c={} if capped else nx.closeness_centrality(G),
+                clustcoef=clustcoef,
+                eig_c=eig_c)
+
+# the pyvis page (graph JSON plus the vis.js bootstrap) is rebuilt only when
+# the graph or its presentation changes; _G and _node_comm follow from the
+# edge/node keys
+@st.cache_resource(max_entries=8)
+def network_html(edge_key, node_key, edge_colors, layout_opt, theme, enable_physics, _G, _node_comm):
+    net = Network(height="650px", width="100%", directed=True,
+                  bgcolor="#222222" if theme=="dark" else "#FFFFFF",
+                  font_color="#FFFFFF" if theme=="dark" else "#000000")
+    if not enable_physics:
+        try: net.toggle_physics(False)
+        except: pass
+    if layout_opt=="hierarchical":
+        net.set_options(json.dumps({
+            "layout":{"hierarchical":{"enabled":True,"direction":"UD","sortMethod":"directed"}}
+        }))
+    elif layout_opt=="circular":
+        pos = nx.circular_layout(_G, scale=500)
+    for n in _G.nodes():
+        idx = _node_comm.get(n,-1)
+        col = f"#{(idx*40)%256:02x}{(idx*80)%256:02x}aa" if idx>=0 else "#888888"
+        if layout_opt=="circular":
+            x,y = pos[n]; net.add_node(n, label=n, color=col, x=x, y=y, fixed=True)
+        else:
+            net.add_node(n, label=n, color=col)
+    # every endpoint was just added from G, so skip add_edge's per-call
+    # node checks (a list scan each, O(E·V) overall) and append in bulk
+    net.edges.extend(Edge(u,v,True,color=d["color"],width=d["weight"]*0.5,title=d["title"]).options
+                     for u,v,d in _G.edges(data=True))
+    try: net.show_buttons(filter_=['physics'])
+    except: pass
+    return net.generate_html()
+
+@st.cache_data
+def default_palette(types):
+    return {t: f"#{(i*50)%256:02x}{(i*80)%256:02x}{(i*110)%256:02x}"
+            for i, t in enumerate(types)}
+
 # ----------------------------------------------------------------------------
 # APP SETUP
 # ----------------------------------------------------------------------------
@@ -88,8 +427,33 @@ if not uploaded:
     )
     st.stop()
 
-data = load_data(uploaded)
-df_events, df_poses, df_joints = parse_robot_data(data)
+# heavy imports are deferred until a file is uploaded so the landing page
+# does not wait on pandas/networkx/plotly; the functions above resolve
+# them at call time
+import networkx as nx
+from pyvis.network import Network
+from pyvis.edge import Edge
+import pandas as pd
+import numpy as np
+import altair as alt
+import plotly.graph_objs as go
+
+# st.cache_data hands back a fresh copy on every hit; keep the loaded
+# frames in session state and only go back to the cache on a new upload.
+# The content is hashed once per upload, so re-uploading the same log
+# (or a browser refresh) still hits the cache
+if st.session_state.get('file_id') != uploaded.file_id:
+    digest = content_digest(uploaded)
+    try:
+        st.session_state.robot_data = load_robot_data(digest, uploaded)
+    except ValueError as e:  # orjson.JSONDecodeError, or not an array of objects
+        st.error(f"Invalid JSON file: {e}")
+        st.stop()
+    st.session_state.update(file_id=uploaded.file_id, data_key=digest)
+data_key = st.session_state.data_key
+rd = st.session_state.robot_data
+df_events, df_poses, df_joints = rd['events'], rd['poses'], rd['joints']
+topics, types, max_w = rd['topics'], rd['types'], rd['max_w']
 if df_events.empty:
     st.error("No valid event messages in JSON.")
     st.stop()
@@ -101,26 +465,25 @@ t_min, t_max = df_events['timestamp'].min(), df_events['timestamp'].max()
 # ----------------------------------------------------------------------------
 
 st.sidebar.header("Filters & Controls")
-topics = sorted(df_events['topic'].unique())
-types  = sorted(df_events['type'].unique())
-
-sel_topics  = st.sidebar.multiselect("Topics", topics, default=topics)
-sel_types   = st.sidebar.multiselect("Event Types", types, default=types)
-time_window = st.sidebar.slider("Time Window (s)",
-                                float(t_min), float(t_max),
-                                (float(t_min), float(t_max)),
-                                step=1.0)
-search_node = st.sidebar.text_input("Search Node")
-
-edges_all = df_events.groupby(['source','target']).size().reset_index(name='weight')
-max_w     = int(edges_all['weight'].max())
-thresh    = st.sidebar.slider("Min Edge Weight", 1, max(1,max_w), 1)
-
-type_colors = {
-    t: st.sidebar.color_picker(f"Color for {t}",
-                               f"#{(i*50)%256:02x}{(i*80)%256:02x}{(i*110)%256:02x}")
-    for i,t in enumerate(types)
-}
+# the filters feed the graph rebuild and its metrics; batch them in a form
+# so adjusting several costs one rerun, on Apply, instead of one each
+with st.sidebar.form("filters"):
+    sel_topics  = st.multiselect("Topics", topics, default=topics)
+    sel_types   = st.multiselect("Event Types", types, default=types)
+    time_window = st.slider("Time Window (s)",
+                            float(t_min), float(t_max),
+                            (float(t_min), float(t_max)),
+                            step=1.0)
+    search_node = st.text_input("Search Node")
+
+    thresh    = st.slider("Min Edge Weight", 1, max(1,max_w), 1)
+    st.form_submit_button("Apply")
+
+# one picker per event type, tucked into a collapsed expander so a long
+# type list does not push the playback controls off screen
+with st.sidebar.expander("Colors", expanded=False):
+    type_colors = {t: st.color_picker(f"Color for {t}", c)
+                   for t, c in default_palette(tuple(types)).items()}
 theme         = st.sidebar.selectbox("Theme", ['light','dark'])
 enable_physics= st.sidebar.checkbox("Enable Physics", False)
 layout_opt    = st.sidebar.selectbox("Layout", ['force','hierarchical','circular'])
@@ -134,98 +497,111 @@ if st.sidebar.button("Reset Filters"):
 # PLAYBACK STATE
 # ----------------------------------------------------------------------------
 
-if 'current_time' not in st.session_state:
-    st.session_state.current_time = t_min
-if 'playing' not in st.session_state:
-    st.session_state.playing = False
+st.session_state.setdefault('playing', False)
+# seeded on its own: Streamlit drops the slider's keyed state on any run
+# that stops before rendering it (landing page, load errors), while
+# 'playing' survives
+st.session_state.setdefault('current_time', t_min)
 
 c1, c2, c3 = st.sidebar.columns(3)
 if c1.button("▶ Play"):   st.session_state.playing = True
 if c2.button("⏸ Pause"):  st.session_state.playing = False
 if c3.button("🔁 Reset"):  st.session_state.current_time = t_min
 
-# run autorefresh only when playing or auto_play
+# playback is driven by a timer fragment: each tick advances the clock and
+# reruns the app; the inline call made during a full run is a no-op
+@st.fragment(run_every=play_speed)
+def playback_clock():
+    if st.session_state.pop('full_run', False):
+        return
+    # snap to the 0.1 s speed grid so float drift does not mint a new time
+    # value per tick, and stop rerunning once the clock is parked at t_max
+    t = min(t_max, round(st.session_state.current_time + play_speed, 1))
+    if t == st.session_state.current_time:
+        return
+    st.session_state.current_time = t
+    st.rerun()
+
+# run the clock only when playing or auto_play
 if st.session_state.playing or auto_play:
-    try:
-        st_autorefresh(interval=int(play_speed*1000), limit=None, key="auto_ref")
-        st.session_state.current_time = min(t_max, st.session_state.current_time + play_speed)
-    except:
-        pass
+    st.session_state.full_run = True
+    playback_clock()
 
-st.session_state.current_time = st.sidebar.slider("Current Time (s)",
-                                                 float(t_min), float(t_max),
-                                                 st.session_state.current_time,
-                                                 step=1.0)
+# the slider is bound to session_state by key, so clock ticks update it in
+# place; passing the value instead gave it a new identity on every tick
+st.session_state.current_time = min(max(st.session_state.current_time, t_min), t_max)
+st.sidebar.slider("Current Time (s)", float(t_min), float(t_max), step=1.0, key="current_time")
 cur_time = st.session_state.current_time
 
 # ----------------------------------------------------------------------------
 # FILTERED DATA & GRAPH
 # ----------------------------------------------------------------------------
 
-df_f = df_events[
-    (df_events.timestamp >= time_window[0]) &
-    (df_events.timestamp <= cur_time) &
-    df_events.topic.isin(sel_topics) &
-    df_events.type.isin(sel_types)
-]
+# events are sorted by timestamp, so the time bounds are two binary searches
+ts_all = df_events['timestamp'].to_numpy()
+lo = ts_all.searchsorted(time_window[0], side='left')
+hi = ts_all.searchsorted(cur_time, side='right')
+df_win = df_events.iloc[lo:hi]
+# topic/type membership on int codes: a boolean lookup table per option
+# list, gathered by code, instead of hashing strings per event
+topic_on = np.zeros(len(topics), bool); topic_on[pd.Index(topics).get_indexer(sel_topics)] = True
+type_on  = np.zeros(len(types), bool);  type_on[pd.Index(types).get_indexer(sel_types)] = True
+# with every option selected (the default, and the usual state during
+# playback) the window slice is already the result
+if topic_on.all() and type_on.all():
+    df_f = df_win
+else:
+    df_f = df_win[topic_on[rd['topic_codes'][lo:hi]] & type_on[rd['type_codes'][lo:hi]]]
 if search_node:
-    mask = df_f.source.str.contains(search_node, case=False) | df_f.target.str.contains(search_node, case=False)
-    df_f = df_f[mask]
+    hit = pd.Series(rd['node_names']).str.contains(search_node, case=False, na=False).to_numpy()
+    rows = df_f.index.to_numpy()
+    df_f = df_f[hit[rd['src_codes'][rows]] | hit[rd['tgt_codes'][rows]]]
 
 if df_f.empty:
     st.warning("No events match current filters.")
-edges_df = df_f.groupby(['source','target']).size().reset_index(name='weight')
-edges_df = edges_df[edges_df['weight'] >= thresh]
+rows = df_f.index.to_numpy()  # positions in df_events
+ecodes = rd['edge_codes'][rows]
+weight = np.bincount(ecodes, minlength=len(rd['edge_src']))
+kept = np.flatnonzero(weight >= thresh)
+edges_df = pd.DataFrame({'source': rd['edge_src'][kept], 'target': rd['edge_tgt'][kept],
+                         'weight': weight[kept]})
+
+# most frequent type per kept edge from one (edge, type) count table; argmax
+# takes the first, i.e. smallest, type on ties, as Series.mode() did
+slot = np.full(len(weight), -1); slot[kept] = np.arange(len(kept))
+es = slot[ecodes]; on = es >= 0
+n_types = max(1, len(types))
+type_counts = np.bincount(es[on] * n_types + rd['type_codes'][rows][on],
+                          minlength=len(kept) * n_types).reshape(len(kept), n_types)
+edge_types = type_counts.argmax(axis=1)
 
 G = nx.DiGraph()
-for _, r in edges_df.iterrows():
-    sub = df_f[(df_f.source==r.source)&(df_f.target==r.target)]
-    evt = sub.type.mode().iloc[0]
-    G.add_edge(r.source, r.target,
-               weight=int(r.weight),
-               color=type_colors.get(evt,'#888888'),
-               title=f"Count: {r.weight}")
-for n in set(df_f.source)|set(df_f.target):
-    if n not in G:
-        G.add_node(n)
-
-# community detection
-try:
-    from networkx.algorithms.community import greedy_modularity_communities
-    comms = list(greedy_modularity_communities(G, cutoff=0.05))
-    if not comms: comms = [set(G.nodes())]
-except:
-    comms = [set(G.nodes())]
+G.add_edges_from(
+    (u, v, {'weight': int(w),
+            'color': type_colors.get(types[t],'#888888'),
+            'title': f"Count: {w}"})
+    for u, v, w, t in zip(edges_df['source'], edges_df['target'], edges_df['weight'], edge_types))
+# endpoints of filtered events below the weight threshold stay as isolated
+# nodes; unique over the int codes, in first-seen order
+G.add_nodes_from(rd['node_names'][pd.unique(np.concatenate([rd['src_codes'][rows],
+                                                            rd['tgt_codes'][rows]]))])
+
+# community detection and metrics are cached on the graph's content
+edge_key, node_key = tuple(G.edges(data='weight')), tuple(G.nodes())
+comms = graph_communities(edge_key, node_key)
 node_comm = {n:i for i,c in enumerate(comms) for n in c}
 
 # metrics & centralities with safe defaults
-if G.number_of_nodes() > 0:
-    try:
-        density = nx.density(G)
-    except:
-        density = 0.0
-    try:
-        clust = nx.average_clustering(G.to_undirected())
-    except ZeroDivisionError:
-        clust = 0.0
-    try:
-        avg_short = (nx.average_shortest_path_length(G.to_undirected())
-                     if nx.is_connected(G.to_undirected()) else None)
-    except:
-        avg_short = None
-    deg_c   = nx.degree_centrality(G)
-    betw_c  = nx.betweenness_centrality(G)
-    clos_c  = nx.closeness_centrality(G)
-    clustcoef = nx.clustering(G.to_undirected())
-    try:
-        eig_c = nx.eigenvector_centrality_numpy(G)
-    except:
-        eig_c = {n:0 for n in G.nodes()}
-else:
-    density = clust = 0.0
-    avg_short = None
-    deg_c = betw_c = clos_c = clustcoef = {}
-    eig_c = {}
+gm = graph_metrics(edge_key, node_key)
+density, clust, avg_short = gm['density'], gm['clust'], gm['avg_short']
+deg_c, betw_c, clos_c = gm['deg_c'], gm['betw_c'], gm['clos_c']
+clustcoef, eig_c = gm['clustcoef'], gm['eig_c']
+n_nodes = G.number_of_nodes()
+if n_nodes > COMMUNITY_MAX:
+    st.sidebar.warning(f"{n_nodes} nodes: community detection skipped (limit {COMMUNITY_MAX}).")
+if gm['capped']:
+    st.sidebar.warning(f"{n_nodes} nodes: betweenness is sampled and closeness "
+                       f"is skipped (limit {PATH_METRICS_MAX}).")
 
 # ----------------------------------------------------------------------------
 # TABS UI
@@ -243,40 +619,22 @@ with tabs[0]:
     c3.metric("Density", f"{density:.3f}")
     c3.metric("Avg Clustering", f"{clust:.3f}")
     if avg_short is not None:
-        c3.metric("Avg Shortest Path", f"{avg_short:.3f}")
+        c3.metric("Avg Shortest Path (est.)" if gm['avg_short_est'] else "Avg Shortest Path",
+                  f"{avg_short:.3f}")
 
 with tabs[1]:
     st.header("Network Visualization")
     if G.number_of_nodes()==0:
         st.info("No nodes to display.")
     else:
-        net = Network(height="650px", width="100%", directed=True,
-                      bgcolor="#222222" if theme=="dark" else "#FFFFFF",
-                      font_color="#FFFFFF" if theme=="dark" else "#000000")
-        if not enable_physics:
-            try: net.toggle_physics(False)
-            except: pass
-        if layout_opt=="hierarchical":
-            net.set_options(json.dumps({
-                "layout":{"hierarchical":{"enabled":True,"direction":"UD","sortMethod":"directed"}}
-            }))
-        elif layout_opt=="circular":
-            pos = nx.circular_layout(G, scale=500)
-        for n in G.nodes():
-            idx = node_comm.get(n,-1)
-            col = f"#{(idx*40)%256:02x}{(idx*80)%256:02x}aa" if idx>=0 else "#888888"
-            if layout_opt=="circular":
-                x,y = pos[n]; net.add_node(n, label=n, color=col, x=x, y=y, fixed=True)
-            else:
-                net.add_node(n, label=n, color=col)
-        for u,v,d in G.edges(data=True):
-            net.add_edge(u,v,color=d["color"],width=d["weight"]*0.5,title=d["title"])
-        try: net.show_buttons(filter_=['physics'])
-        except: pass
-        html(net.generate_html(), height=650)
-        st.download_button("Download GraphML", "\n".join(nx.generate_graphml(G)), file_name="graph.graphml")
-
-with tabs[2]:
+        html(network_html(edge_key, node_key, tuple(c for _, _, c in G.edges(data='color')),
+                          layout_opt, theme, enable_physics, G, node_comm), height=650)
+        st.download_button("Download GraphML", lambda: "\n".join(nx.generate_graphml(G)), file_name="graph.graphml")
+
+# node selection and path search only touch the graph, so their widgets
+# rerun this fragment instead of the whole filter/graph pipeline
+@st.fragment
+def node_inspector(G, node_comm):
     st.header("Inspector & Shortest Path")
     if G.number_of_nodes()==0:
         st.info("No nodes to inspect.")
@@ -284,10 +642,12 @@ with tabs[2]:
         nodes = sorted(G.nodes())
         sel_n = st.selectbox("Select Node", nodes)
         if sel_n:
-            st.metric("Degree",    G.degree(sel_n))
-            st.metric("In‑Degree", G.in_degree(sel_n))
-            st.metric("Out‑Degree",G.out_degree(sel_n))
-            st.metric("Community", node_comm.get(sel_n,-1))
+            st.table(pd.DataFrame({
+                "Degree":     [G.degree(sel_n)],
+                "In‑Degree":  [G.in_degree(sel_n)],
+                "Out‑Degree": [G.out_degree(sel_n)],
+                "Community":  [node_comm.get(sel_n,-1)],
+            }, index=[sel_n]))
             st.write("Neighbors:", list(G.neighbors(sel_n)))
         st.subheader("Shortest Path")
         src = st.selectbox("From", nodes, key="spf_src")
@@ -296,11 +656,21 @@ with tabs[2]:
             try: st.success(" → ".join(nx.shortest_path(G,src,dst)))
             except: st.error("No path found.")
 
+with tabs[2]:
+    node_inspector(G, node_comm)
+
 with tabs[3]:
     st.header("Data Explorer")
-    with st.expander("Raw JSON"): st.json(data)
+    # expander bodies are sent on every rerun even when collapsed; only ship
+    # the upload text when asked, with the tree collapsed below the top level
+    if st.toggle("Show raw JSON"):
+        # decode straight from the upload buffer; getvalue() copied the bytes first
+        with uploaded.getbuffer() as buf:
+            st.json(str(buf, 'utf-8'), expanded=1)
     st.dataframe(df_f.drop(columns=['raw'], errors='ignore'))
-    st.download_button("Download CSV", df_f.to_csv(index=False).encode(), file_name="events.csv")
+    # export bodies are built only when clicked (on a separate thread), not
+    # serialized on every rerun
+    st.download_button("Download CSV", lambda: df_f.to_csv(index=False).encode(), file_name="events.csv")
 
 with tabs[4]:
     st.header("Analytics")
@@ -315,8 +685,10 @@ with tabs[4]:
 
         st.subheader("Sankey Diagram")
         nlist = list(G.nodes())
-        si = [nlist.index(u) for u in edges_df['source']]
-        ti = [nlist.index(v) for v in edges_df['target']]
+        # hashed positions; list.index rescanned the node list per edge
+        nidx = pd.Index(nlist)
+        si = nidx.get_indexer(edges_df['source']).tolist()
+        ti = nidx.get_indexer(edges_df['target']).tolist()
         sankey = go.Figure(go.Sankey(
             node=dict(label=nlist, pad=15, thickness=20),
             link=dict(source=si, target=ti, value=edges_df['weight'])
@@ -335,17 +707,15 @@ with tabs[4]:
         st.table(cent.sort_values('degree', ascending=False).head(5))
 
         st.subheader("Events Over Time by Topic")
-        ts_t = (df_events[df_events.topic.isin(sel_topics)]
-                .groupby([pd.cut(df_events['timestamp'], bins=50), 'topic'])
-                .size().reset_index(name='count'))
+        ts_t = time_bin_counts(rd['time_bins'], rd['bin_labels'],
+                               rd['topic_codes'], topics, topic_on, 'topic')
         st.altair_chart(alt.Chart(ts_t).mark_line().encode(
             x='timestamp:O', y='count:Q', color='topic:N'
         ), use_container_width=True)
 
         st.subheader("Events Over Time by Type")
-        ts_ty = (df_events[df_events.type.isin(sel_types)]
-                 .groupby([pd.cut(df_events['timestamp'], bins=50), 'type'])
-                 .size().reset_index(name='count'))
+        ts_ty = time_bin_counts(rd['time_bins'], rd['bin_labels'],
+                                rd['type_codes'], types, type_on, 'type')
         st.altair_chart(alt.Chart(ts_ty).mark_line().encode(
             x='timestamp:O', y='count:Q', color='type:N'
         ), use_container_width=True)
@@ -353,19 +723,13 @@ with tabs[4]:
 with tabs[5]:
     st.header("Pose & Joint States")
     if not df_poses.empty:
-        fig3d = go.Figure(go.Scatter3d(
-            x=df_poses['x'], y=df_poses['y'], z=df_poses['z'],
-            mode='markers+lines', marker=dict(size=3)
-        ))
-        fig3d.update_layout(scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z'))
-        st.plotly_chart(fig3d, use_container_width=True)
+        st.plotly_chart(pose_figure(data_key, df_poses), use_container_width=True)
     else:
         st.info("No pose data.")
 
     if not df_joints.empty:
-        jt = alt.Chart(df_joints).mark_line().encode(
-            x='timestamp:Q', y='angle:Q', color='joint:N'
-        )
-        st.altair_chart(jt, use_container_width=True)
+        fig_j = go.Figure(joint_figure(data_key, df_joints))  # copy: the cached base stays cursor-free
+        fig_j.add_vline(x=cur_time, line_color='red')
+        st.plotly_chart(fig_j, use_container_width=True)
     else:
         st.info("No joint-state data.")
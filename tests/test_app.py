@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    # the app reads CACHE_DIR from XDG_CACHE_HOME on every run; without this a
+    # frame cached by an earlier run would skip load_data, and the suite
+    # would write into the developer's own cache
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+
+def sample_log(n=40):
+    return json.dumps([
+        {"topic": f"/t{i % 3}", "operation": "publish", "timestamp": 1000.0 + i,
+         "msg": {"from": f"n{i % 5}", "to": f"n{(i * 3 + 1) % 7}", "type": "move"}}
+        for i in range(n)
+    ]).encode()
+
+
+def upload(at, content, name="log.json"):
+    at.sidebar.file_uploader[0].set_value((name, content, "application/json"))
+    return at.run()
+
+
+def test_reupload_after_removing_file():
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    upload(at, sample_log())
+    assert not at.exception
+    at.sidebar.file_uploader[0].set_value(None)
+    at.run()
+    assert not at.exception
+    upload(at, sample_log())
+    assert not at.exception
+    assert at.metric[0].value == "40"
+
+
+def test_valid_upload_after_invalid_one():
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    upload(at, sample_log())
+    upload(at, b"[1, 2")
+    assert at.error
+    upload(at, sample_log())
+    assert not at.exception
+    assert not at.error
+
+
+def test_padded_and_bom_prefixed_arrays_load():
+    for content in (b" " * 4096 + sample_log(), b"\xef\xbb\xbf" + sample_log()):
+        at = AppTest.from_file(APP, default_timeout=120).run()
+        upload(at, content)
+        assert not at.exception
+        assert not at.error
+        assert at.metric[0].value == "40"
+
+
+def test_array_of_non_objects_is_rejected():
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    upload(at, b"[1, 2, 3]")
+    assert not at.exception
+    assert "Invalid JSON file" in at.error[0].value
+
+
+def test_object_upload_is_rejected():
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    upload(at, b'\xef\xbb\xbf  {"messages": []}')
+    assert not at.exception
+    assert "Invalid JSON file" in at.error[0].value
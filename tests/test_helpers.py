@@ -0,0 +1,77 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def load_app_helpers():
+    # app.py is a Streamlit script: run only the definitions above its APP
+    # SETUP section, with the libraries it imports after the landing page
+    with open(APP, encoding="utf-8") as f:
+        src = f.read()
+    app = types.ModuleType("app")
+    app.__dict__.update(np=np, pd=pd)
+    exec(compile(src[:src.index("# APP SETUP")], APP, "exec"), app.__dict__)
+    return app
+
+
+app = load_app_helpers()
+
+
+def noisy(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.standard_normal(n).astype(np.float32)
+    y[rng.random(n) < 0.1] = np.nan
+    y[-3:] = np.nan
+    return y
+
+
+def test_minmax_indices_short_series_is_untouched():
+    y = noisy(500)
+    assert np.array_equal(app.minmax_indices(y, n_out=500), np.arange(500))
+
+
+@pytest.mark.parametrize("n_out", [2000, 100])
+@pytest.mark.parametrize("extra", [1, 7, None])
+def test_minmax_indices_stays_within_n_out(n_out, extra):
+    # just above n_out, a short last bucket, and a large series
+    n = 3 * n_out + extra if extra else 500 * n_out + 1
+    idx = app.minmax_indices(noisy(n), n_out=n_out)
+    assert len(idx) <= n_out
+    assert np.all(np.diff(idx) > 0)
+    assert 0 <= idx[0] and idx[-1] < n
+
+
+@pytest.mark.parametrize("n", [2001, 2999, 123457])
+def test_minmax_indices_keeps_global_extremes(n):
+    y = noisy(n, seed=n)
+    idx = app.minmax_indices(y)
+    assert np.nanargmin(y) in idx
+    assert np.nanargmax(y) in idx
+    assert idx[-1] < n
+
+
+def test_minmax_indices_all_nan():
+    idx = app.minmax_indices(np.full(5001, np.nan))
+    assert len(idx) <= 2000
+    assert idx[-1] < 5001
+
+
+def test_prune_cache_evicts_oldest_frames_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "CACHE_MAX_BYTES", 250)
+    # (name, size, mtime); the temp file is the oldest and alone over the cap
+    files = [("partial.tmp", 10_000, 1), ("kept.v1.events.feather", 100, 2),
+             ("a.v1.events.feather", 100, 3), ("b.v1.events.feather", 100, 4),
+             ("c.v1.events.feather", 100, 5)]
+    for name, size, mtime in files:
+        p = tmp_path / name
+        p.write_bytes(b"x" * size)
+        os.utime(p, (mtime, mtime))
+    app.prune_cache("kept")
+    assert sorted(os.listdir(tmp_path)) == ["c.v1.events.feather", "kept.v1.events.feather",
+                                            "partial.tmp"]